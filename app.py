@@ -1,13 +1,35 @@
-from fastapi import FastAPI, HTTPException, Depends, Security
+from fastapi import FastAPI, HTTPException, Depends, Header, Security
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel, HttpUrl
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional
+from contextlib import asynccontextmanager
+import asyncio
 import uvicorn
 import os
 
-from processor import handler as process_handler
+from processor import handler as process_handler, get_result, close_client
 
-app = FastAPI(title="Doc Processor API", description="Process documents through enhanced Docling pipeline")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Close pooled keep-alive connections cleanly on shutdown
+    await close_client()
+
+app = FastAPI(
+    title="Doc Processor API",
+    description="Process documents through enhanced Docling pipeline",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
+)
+
+# Media type served for each export format
+MEDIA_TYPES = {
+    "markdown": "text/markdown",
+    "html": "text/html",
+    "json": "application/json",
+    "text": "text/plain",
+}
 
 # Security
 security = HTTPBearer()
@@ -25,6 +47,12 @@ def verify_api_key(credentials: HTTPAuthorizationCredentials = Security(security
 
 class ProcessRequest(BaseModel):
     document_url: HttpUrl
+    export_format: str = "markdown"
+    max_pages: Optional[int] = None
+    enrichments: Optional[List[str]] = None
+    high_quality_tables: bool = False
+    force_ocr: bool = False
+    include_content: bool = True
 
 class ProcessResult(BaseModel):
     result: Dict[str, Any]
@@ -38,22 +66,80 @@ async def root():
     }
 
 @app.post("/process", response_model=ProcessResult)
-async def process_document(request: ProcessRequest, api_key: str = Depends(verify_api_key)):
+async def process_document(
+    request: ProcessRequest,
+    api_key: str = Depends(verify_api_key),
+    if_none_match: Optional[str] = Header(None),
+):
     """
     Process a document through the enhanced Docling pipeline.
     
     - **document_url**: URL of the document to process (PDF, etc.)
+    - **export_format**: markdown (default), html, json or text
+    - **max_pages**: only process the first N pages
+    - **enrichments**: enrichments to run, e.g. `["ocr", "table_structure"]`
+      (defaults to the ones enabled for the server's DEVICE_CAPABILITY)
+    - **high_quality_tables**: parse PDFs with Docling's native backend
+      (slower, better tables) instead of pypdfium
+    - **force_ocr**: OCR every page in full, even PDFs that already have a
+      text layer (by default only bitmap regions are OCR'd)
+    - **include_content**: set to false to get only the metadata plus a
+      `content_url` that streams the processed content
     
     Downloads the document, processes it through Docling, and returns
     the processed output along with useful metadata.
     
     Requires Authorization header with Bearer token (API key).
+
+    The response carries an ETag identifying the processed output; send it
+    back in If-None-Match to get a 304 when nothing changed.
     """
     try:
-        result = process_handler(str(request.document_url))
-        return ProcessResult(result=result)
+        result = await process_handler(
+            str(request.document_url),
+            export_format=request.export_format,
+            max_pages=request.max_pages,
+            enrichments=request.enrichments,
+            high_quality_tables=request.high_quality_tables,
+            force_ocr=request.force_ocr,
+        )
+        if result["status"] == "error":
+            raise HTTPException(status_code=422, detail=f"Document processing failed: {result['error']}")
+        document_id = result["metadata"]["document_id"]
+        etag = f'W/"{document_id}"'
+        if if_none_match == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        if not request.include_content:
+            result = {k: v for k, v in result.items() if k != "content"}
+            result["content_url"] = f"/process/{document_id}/content"
+        # Returned as-is so the (large) result skips response_model validation
+        return ORJSONResponse({"result": result}, headers={"ETag": etag})
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Document processing failed: {str(e)}")
 
+def _iter_chunks(content: str, size: int = 64 * 1024):
+    """Yield *content* as encoded chunks of at most *size* characters."""
+    for start in range(0, len(content), size):
+        yield content[start:start + size].encode()
+
+@app.get("/process/{document_id}/content")
+async def document_content(document_id: str, api_key: str = Depends(verify_api_key)):
+    """
+    Stream the processed content of an earlier /process call.
+
+    - **document_id**: `metadata.document_id` from the /process response
+    """
+    result = await asyncio.to_thread(get_result, document_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired document")
+    media_type = MEDIA_TYPES.get(result["metadata"]["export_format"], "text/plain")
+    return StreamingResponse(
+        _iter_chunks(result["content"]),
+        media_type=media_type,
+        headers={"ETag": f'W/"{document_id}"'},
+    )
+
 if __name__ == "__main__":
-    uvicorn.run("app:app", host="0.0.0.0", port=8000, workers=int(os.getenv("WORKERS", "1")))
\ No newline at end of file
+    uvicorn.run("app:app", host="0.0.0.0", port=8000, workers=int(os.getenv("WORKERS", "1")), loop="uvloop", http="httptools")
\ No newline at end of file
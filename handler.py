@@ -1,8 +1,14 @@
 import runpod
+import logging
 import os
-from processor import handler as process_handler
+from processor import handler as process_handler, handler_batch
 
-def handler(job):
+log = logging.getLogger(__name__)
+
+def _is_url(value) -> bool:
+    return isinstance(value, str) and value.startswith(("http://", "https://"))
+
+async def handler(job):
     """
     RunPod serverless handler for document processing.
     
@@ -11,10 +17,17 @@ def handler(job):
         "input": {
             "document_url": "https://example.com/document.pdf",
             "export_format": "markdown",  # optional: markdown, html, json, text
-            "max_pages": 10,              # optional: limit number of pages
-            "max_file_size": 104857600    # optional: max file size in bytes (100MB default)
+            "max_pages": 10,              # optional: only convert the first N pages
+            "max_file_size": 104857600,   # optional: max file size in bytes (100MB default)
+            "enrichments": ["ocr"],       # optional: enrichments to run (tier defaults otherwise)
+            "high_quality_tables": false, # optional: slower native PDF parser, better tables
+            "force_ocr": false            # optional: OCR every page even if it has a text layer
         }
     }
+
+    Pass "document_urls" (a list) instead of "document_url" to process
+    several documents concurrently; the response is then
+    {"results": [...], "status": "success"} with one entry per URL, in order.
     
     Returns:
     {
@@ -22,30 +35,63 @@ def handler(job):
         "metadata": {...},
         "status": "success"
     }
+
+    or, for a document that could not be fetched or converted,
+    {"status": "error", "source": ..., "error": "...", "error_type": "..."}.
     """
     try:
-        print(f"[RunPod Handler] Starting job {job['id']}")
+        log.info("Starting job %s", job['id'])
         job_input = job["input"]
         
+        options = dict(
+            export_format=job_input.get("export_format", "markdown"),
+            max_pages=job_input.get("max_pages"),
+            max_file_size=job_input.get("max_file_size", 100 * 1024 * 1024),
+            enrichments=job_input.get("enrichments"),
+            high_quality_tables=bool(job_input.get("high_quality_tables", False)),
+            force_ocr=bool(job_input.get("force_ocr", False)),
+        )
+
+        document_urls = job_input.get("document_urls")
+        if document_urls:
+            # The processor also reads local paths; jobs may only name URLs
+            if not all(_is_url(url) for url in document_urls):
+                return {"error": "document_urls must be http(s) URLs"}
+            log.info("Processing %d documents", len(document_urls))
+            results = await handler_batch(document_urls, **options)
+            log.info("Job %s completed", job['id'])
+            return {
+                "results": [
+                    {"error": f"Document processing failed: {r}", "status": "failed"}
+                    if isinstance(r, Exception) else r
+                    for r in results
+                ],
+                "status": "success",
+            }
+
         # Extract document URL (required)
         document_url = job_input.get("document_url")
         if not document_url:
             return {"error": "document_url is required"}
+        if not _is_url(document_url):
+            return {"error": "document_url must be an http(s) URL"}
         
-        print(f"[RunPod Handler] Processing document: {document_url}")
+        log.info("Processing document: %s", document_url)
         
         # Use the existing processor handler
-        result = process_handler(document_url)
+        result = await process_handler(document_url, **options)
         
-        print(f"[RunPod Handler] Job {job['id']} completed successfully")
+        log.info("Job %s completed successfully", job['id'])
         return result
         
     except Exception as e:
         error_msg = f"Document processing failed: {str(e)}"
-        print(f"[RunPod Handler] Error in job {job['id']}: {error_msg}")
+        log.error("Error in job %s: %s", job['id'], error_msg)
         return {"error": error_msg, "status": "failed"}
 
 # Start the RunPod serverless worker
 if __name__ == "__main__":
-    print("Starting RunPod Document Processor Worker...")
+    log.info("Starting RunPod Document Processor Worker...")
+    # The pooled HTTP client is left for process exit to close: RunPod has no
+    # shutdown hook, and by the time atexit runs its event loop is gone
     runpod.serverless.start({"handler": handler}) 
\ No newline at end of file
@@ -0,0 +1,47 @@
+import os
+
+# Rust-based parallel downloader for the Hugging Face hub; has to be set before
+# huggingface_hub is imported.
+os.environ.setdefault("HF_HUB_ENABLE_HF_TRANSFER", "1")
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from docling.utils.model_downloader import download_models
+
+log = logging.getLogger("preloader")
+
+MODELS_DIR = Path(os.getenv("DOCLING_ARTIFACTS_PATH", "./models"))
+
+# Model groups fetched side by side; each one lands in its own sub-folder
+MODEL_GROUPS = {
+    "layout": "with_layout",
+    "tableformer": "with_tableformer",
+    "code_formula": "with_code_formula",
+    "picture_classifier": "with_picture_classifier",
+    "smolvlm": "with_smolvlm",
+    "easyocr": "with_easyocr",
+}
+
+def _download_group(flag: str) -> Path:
+    """Download the single model group enabled by *flag*."""
+
+    flags = {f: f == flag for f in MODEL_GROUPS.values()}
+    return download_models(output_dir=MODELS_DIR, **flags)
+
+def download_all():
+    """Download every model the processor needs, concurrently."""
+
+    log.info("Downloading models into %s...", MODELS_DIR)
+    with ThreadPoolExecutor(max_workers=len(MODEL_GROUPS)) as executor:
+        futures = {name: executor.submit(_download_group, flag) for name, flag in MODEL_GROUPS.items()}
+        for name, future in futures.items():
+            future.result()
+            log.info("%s ready", name)
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="[Preloader] %(message)s")
+    download_all()
+
+if __name__ == "__main__":
+    main()
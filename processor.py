@@ -1,6 +1,25 @@
+import asyncio
+import atexit
+import copy
+import diskcache
+import functools
+import multiprocessing
+import sys
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from types import MappingProxyType
 import httpx
+import logging
+import orjson
+import tempfile
+from blake3 import blake3
 from io import BytesIO
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
 from pathlib import Path
+from typing import BinaryIO
+from urllib.parse import unquote, urlsplit
 from docling.document_converter import (
     DocumentConverter, 
     PdfFormatOption,
@@ -18,205 +37,1023 @@ from docling.document_converter import (
     FormatOption
 )
 from docling.backend.json.docling_json_backend import DoclingJSONBackend
+from docling.backend.pypdfium2_backend import PyPdfiumDocumentBackend
+from docling.backend.docling_parse_v4_backend import DoclingParseV4DocumentBackend
 from docling.pipeline.simple_pipeline import SimplePipeline
+from docling_core.types.doc import DocItemLabel
 from docling_core.types.io import DocumentStream
-from docling.datamodel.base_models import InputFormat
+from docling.datamodel.base_models import ConversionStatus, InputFormat
+from docling.exceptions import ConversionError
+from docling.datamodel.settings import settings
+from docling.datamodel.accelerator_options import AcceleratorOptions, AcceleratorDevice
 from docling.datamodel.pipeline_options import (
     PdfPipelineOptions,
     TableFormerMode,
     EasyOcrOptions,
     TesseractCliOcrOptions,
+    RapidOcrOptions,
+    PictureDescriptionApiOptions,
     smolvlm_picture_description
 )
 from docling.pipeline.vlm_pipeline import VlmPipeline
+from docling.models.base_model import ItemAndImageEnrichmentElement
+from docling.models.picture_description_api_model import PictureDescriptionApiModel
+from docling.models.picture_description_vlm_model import PictureDescriptionVlmModel
+from docling.models.layout_model import LayoutModel
+from docling.models.table_structure_model import TableStructureModel
+from docling.models.easyocr_model import EasyOcrModel
+from torchao.quantization import quantize_, Float8WeightOnlyConfig, Int8WeightOnlyConfig
+import numpy as np
+import onnxruntime
+import torch
 import os
+import posixpath
+
+class _JsonFormatter(logging.Formatter):
+    """Format each record as one JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return orjson.dumps(entry).decode()
+
+def _configure_logging() -> None:
+    """Send log records through a queue drained by a background thread, so the
+    request path never blocks on writing to stdout.
+
+    LOG_LEVEL sets the threshold (INFO by default) and LOG_FORMAT=json emits
+    one JSON object per line for log ingestion instead of plain text.
+    """
+
+    level = os.getenv("LOG_LEVEL", "INFO").upper()
+    valid_level = isinstance(logging.getLevelName(level), int)
+
+    queue = SimpleQueue()
+    handler = QueueHandler(queue)
+    if os.getenv("LOG_FORMAT", "text").lower() == "json":
+        handler.setFormatter(_JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(name)s] %(message)s"))
+    logging.basicConfig(level=level if valid_level else logging.INFO, handlers=[handler])
+    listener = QueueListener(queue, logging.StreamHandler())
+    listener.start()
+    atexit.register(listener.stop)
+
+    if not valid_level:
+        logging.getLogger(__name__).warning("Unknown LOG_LEVEL='%s', falling back to 'INFO'.", level)
+
+_configure_logging()
+log = logging.getLogger(__name__)
 
 DEVICE_CAPABILITY = os.getenv("DEVICE_CAPABILITY", "high").lower()
 
 VALID_CAPABILITIES = {"low", "medium", "high"}
 if DEVICE_CAPABILITY not in VALID_CAPABILITIES:
-    print(f"[Doc Processor] Unknown DEVICE_CAPABILITY='{DEVICE_CAPABILITY}', falling back to 'high'.")
+    log.warning("Unknown DEVICE_CAPABILITY='%s', falling back to 'high'.", DEVICE_CAPABILITY)
     DEVICE_CAPABILITY = "high"
 
-def _build_pipeline_options(capability: str) -> PdfFormatOption:
-    """Return a PdfFormatOption tuned for *capability* tier."""
+# Enrichments a request can toggle, and what each tier runs when it doesn't
+ENRICHMENTS = (
+    "code_enrichment",
+    "formula_enrichment",
+    "picture_classification",
+    "picture_description",
+    "table_structure",
+    "ocr",
+)
+_TIER_ENRICHMENTS = MappingProxyType({
+    # Skip the heaviest enrichments to minimise CPU/GPU & memory usage.
+    "low": frozenset({"table_structure", "ocr"}),
+    # Keep most textual enrichments but skip vision heavy ones.
+    "medium": frozenset({"code_enrichment", "formula_enrichment", "table_structure", "ocr"}),
+    # Everything switched on.
+    "high": frozenset(ENRICHMENTS),
+})
+DEFAULT_ENRICHMENTS = _TIER_ENRICHMENTS[DEVICE_CAPABILITY]
+
+def _detect_device() -> AcceleratorDevice:
+    """Return the best accelerator available to the models on this host."""
+
+    if torch.cuda.is_available():
+        return AcceleratorDevice.CUDA
+    if torch.backends.mps.is_available():
+        return AcceleratorDevice.MPS
+    return AcceleratorDevice.CPU
+
+ACCELERATOR_DEVICE = _detect_device()
+log.info("Running models on %s.", ACCELERATOR_DEVICE.value)
+
+# OCR engine: "rapidocr" runs detection/recognition through ONNX Runtime,
+# "easyocr" through PyTorch (both on the accelerator when there is one),
+# "tesseract" shells out to the CPU-only tesseract CLI.
+OCR_ENGINE = os.getenv("OCR_ENGINE", "rapidocr").lower()
+
+VALID_OCR_ENGINES = {"rapidocr", "easyocr", "tesseract"}
+if OCR_ENGINE not in VALID_OCR_ENGINES:
+    log.warning("Unknown OCR_ENGINE='%s', falling back to 'rapidocr'.", OCR_ENGINE)
+    OCR_ENGINE = "rapidocr"
+
+# The CPU onnxruntime build shadows onnxruntime-gpu if both are installed,
+# leaving RapidOCR on the CPU without a word; no CUDAExecutionProvider here
+# means that happened
+if OCR_ENGINE == "rapidocr":
+    log.info("ONNX Runtime providers: %s.", ", ".join(onnxruntime.get_available_providers()))
+
+# Text boxes EasyOCR recognizes per forward pass; its default of 1 leaves the
+# GPU mostly idle on text-dense pages
+EASYOCR_BATCH_SIZE = int(os.getenv("EASYOCR_BATCH_SIZE", "8"))
+
+# Weight-only quantization for the picture description VLM: "fp8" needs an
+# Ada/Hopper GPU (sm_89+), "auto" picks fp8 there and int8 elsewhere.
+# "fp16" only casts the weights, for pre-Ampere GPUs, which lack fast bf16;
+# "bf16" is what Docling loads them as anyway, so it is the same as "none".
+VLM_QUANTIZATION = os.getenv("VLM_QUANTIZATION", "auto").lower()
+
+VALID_QUANTIZATIONS = {"auto", "fp8", "int8", "bf16", "fp16", "none"}
+if VLM_QUANTIZATION not in VALID_QUANTIZATIONS:
+    log.warning("Unknown VLM_QUANTIZATION='%s', falling back to 'auto'.", VLM_QUANTIZATION)
+    VLM_QUANTIZATION = "auto"
+
+# OpenAI-compatible chat completions endpoint of a vLLM/SGLang server to send
+# picture descriptions to, instead of running SmolVLM in-process
+VLM_API_URL = os.getenv("VLM_API_URL")
+VLM_API_MODEL = os.getenv("VLM_API_MODEL", "HuggingFaceTB/SmolVLM-256M-Instruct")
+VLM_API_CONCURRENCY = int(os.getenv("VLM_API_CONCURRENCY", "16"))
+
+# Compile the preset pipeline's layout, TableFormer and EasyOCR models with
+# torch.compile at startup, on CUDA ("1" to enable). Autotuning takes minutes,
+# so only turn it on where TORCHINDUCTOR_CACHE_DIR persists across restarts.
+TORCH_COMPILE = os.getenv("TORCH_COMPILE", "0") == "1"
+
+# Docling pushes pages through the layout, table and OCR stages in batches of
+# this size. Its default of 4 keeps each forward pass too small to load a GPU.
+settings.perf.page_batch_size = int(os.getenv("PAGE_BATCH_SIZE", "16"))
+
+# Let cuDNN pick the fastest convolution algorithms for the shapes it sees
+torch.backends.cudnn.benchmark = True
+
+# One page saying "Warmup", converted once at startup
+_WARMUP_PDF = (
+    b'%PDF-1.4\n'
+    b'1 0 obj\n'
+    b'<< /Type /Catalog /Pages 2 0 R >>\n'
+    b'endobj\n'
+    b'2 0 obj\n'
+    b'<< /Type /Pages /Kids [3 0 R] /Count 1 >>\n'
+    b'endobj\n'
+    b'3 0 obj\n'
+    b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R /Resources << /Font << /F1 5 0 R >> >> >>\n'
+    b'endobj\n'
+    b'4 0 obj\n'
+    b'<< /Length 37 >>\n'
+    b'stream\n'
+    b'BT /F1 24 Tf 72 700 Td (Warmup) Tj ET\n'
+    b'endstream\n'
+    b'endobj\n'
+    b'5 0 obj\n'
+    b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>\n'
+    b'endobj\n'
+    b'xref\n'
+    b'0 6\n'
+    b'0000000000 65535 f \n'
+    b'0000000009 00000 n \n'
+    b'0000000058 00000 n \n'
+    b'0000000115 00000 n \n'
+    b'0000000241 00000 n \n'
+    b'0000000328 00000 n \n'
+    b'trailer\n'
+    b'<< /Size 6 /Root 1 0 R >>\n'
+    b'startxref\n'
+    b'398\n'
+    b'%%EOF\n'
+)
+
+def _build_ocr_options(engine: str, force_full_page: bool = False):
+    """Return OCR options for the selected *engine*.
+
+    Unless *force_full_page*, only bitmap regions are OCR'd and text the PDF
+    already carries is used as-is.
+    """
+
+    if engine == "tesseract":
+        return TesseractCliOcrOptions(force_full_page_ocr=force_full_page)
+    if engine == "easyocr":
+        # Runs on the pipeline's accelerator_options device
+        return EasyOcrOptions(force_full_page_ocr=force_full_page)
+    return RapidOcrOptions(force_full_page_ocr=force_full_page)
+
+def _build_picture_description_options():
+    """Return picture description options: the served VLM behind VLM_API_URL
+    when set, SmolVLM loaded in-process otherwise."""
+
+    if VLM_API_URL is None:
+        return smolvlm_picture_description
+
+    # The server batches concurrent requests (continuous batching), so keep
+    # plenty of pictures in flight
+    return PictureDescriptionApiOptions(
+        url=VLM_API_URL,
+        params={"model": VLM_API_MODEL, "max_completion_tokens": 200},
+        prompt=smolvlm_picture_description.prompt,
+        timeout=60,
+        concurrency=VLM_API_CONCURRENCY,
+    )
+
+def _build_pipeline_options(capability: str, enrichments: frozenset,
+                            force_ocr: bool = False) -> PdfFormatOption:
+    """Return a PdfFormatOption tuned for *capability* tier, running exactly
+    the *enrichments* requested (OCR over whole pages with *force_ocr*)."""
 
     pipeline_options = PdfPipelineOptions()
+    pipeline_options.accelerator_options = AcceleratorOptions(
+        device=ACCELERATOR_DEVICE,
+        num_threads=os.cpu_count(),
+    )
 
-    if capability == "low":
-        # Disable the heaviest enrichments to minimise CPU/GPU & memory usage.
-        pipeline_options.do_code_enrichment = False
-        pipeline_options.do_formula_enrichment = False
-        pipeline_options.generate_picture_images = False
-        pipeline_options.do_picture_classification = False
-        pipeline_options.do_picture_description = False
-        pipeline_options.do_table_structure = True
-        pipeline_options.do_ocr = True
-        pipeline_options.ocr_options = TesseractCliOcrOptions(
-            force_full_page_ocr=True,
-        )
-    elif capability == "medium":
-        # Keep most textual enrichments but skip vision heavy ones.
-        pipeline_options.do_code_enrichment = True
-        pipeline_options.do_formula_enrichment = True
-        pipeline_options.generate_picture_images = False  # skip PNG rendering
-        pipeline_options.do_picture_classification = False
-        pipeline_options.do_picture_description = False
-        pipeline_options.do_table_structure = True
-        pipeline_options.do_ocr = True
-        pipeline_options.ocr_options = TesseractCliOcrOptions(
-            force_full_page_ocr=True,
-        )
-    else:  # "high"
-        # Full-fat experience with all enrichments switched on.
-        pipeline_options.do_code_enrichment = True
-        pipeline_options.do_formula_enrichment = True
+    pipeline_options.do_code_enrichment = "code_enrichment" in enrichments
+    pipeline_options.do_formula_enrichment = "formula_enrichment" in enrichments
+    pipeline_options.do_picture_classification = "picture_classification" in enrichments
+    # Pictures are described in a second pass (_describe_pictures), so the
+    # VLM is only loaded once a document actually has some
+    pipeline_options.do_picture_description = False
+    pipeline_options.do_table_structure = "table_structure" in enrichments
+    pipeline_options.do_ocr = "ocr" in enrichments
+    pipeline_options.ocr_options = _build_ocr_options(OCR_ENGINE, force_ocr)
+
+    if capability == "high":
+        # Full-fat rendering and the most accurate table model.
         pipeline_options.generate_picture_images = True
         pipeline_options.images_scale = 2
-        pipeline_options.do_picture_classification = True
-        pipeline_options.do_picture_description = True
-        pipeline_options.picture_description_options = smolvlm_picture_description
-        pipeline_options.do_table_structure = True
         pipeline_options.table_structure_options.do_cell_matching = True
         pipeline_options.table_structure_options.mode = TableFormerMode.ACCURATE
-        pipeline_options.do_ocr = True
-        pipeline_options.ocr_options = TesseractCliOcrOptions(
-            force_full_page_ocr=True,
-        )
+    elif "picture_description" in enrichments:  # "low" / "medium"
+        # The describer needs the picture crops, at the 2x scale Docling's own
+        # description stage uses; 72 dpi loses small text and detail
+        pipeline_options.generate_picture_images = True
+        pipeline_options.images_scale = 2
+    else:
+        # skip PNG rendering
+        pipeline_options.generate_picture_images = False
 
     return pipeline_options
 
-def create_converter() -> DocumentConverter:
-    """Create a DocumentConverter configured from environment variables."""
+def _pipeline_stages(converter: DocumentConverter):
+    """Yield every model stage of *converter*'s PDF pipeline."""
+
+    pipeline = converter._get_pipeline(InputFormat.PDF)
+    if pipeline is None:
+        return
+    yield from pipeline.build_pipe
+    yield from pipeline.enrichment_pipe
+
+def _vlm_quantization_mode() -> str:
+    """Return the VLM_QUANTIZATION mode in effect on this host."""
+
+    if VLM_API_URL is not None or not torch.cuda.is_available() or VLM_QUANTIZATION == "bf16":
+        return "none"
+    if VLM_QUANTIZATION == "auto":
+        return "fp8" if torch.cuda.get_device_capability() >= (8, 9) else "int8"
+    return VLM_QUANTIZATION
 
-    pipeline_options = _build_pipeline_options(DEVICE_CAPABILITY)
+def _quantize_picture_description(describer: PictureDescriptionVlmModel) -> None:
+    """Quantize the picture description VLM weights in place (CUDA only)."""
+
+    mode = _vlm_quantization_mode()
+    if mode == "none":
+        return
+
+    if mode == "fp16":
+        describer.model.to(torch.float16)
+    else:
+        config = Float8WeightOnlyConfig() if mode == "fp8" else Int8WeightOnlyConfig()
+        quantize_(describer.model, config)
+    log.info("Picture description model quantized to %s.", mode)
+
+# Picture description model, loaded by the first document with pictures
+_DESCRIBER = None
+_DESCRIBER_LOCK = threading.Lock()
+
+def _picture_describer():
+    """Return the picture description model: the served VLM behind
+    VLM_API_URL when set, SmolVLM loaded in-process otherwise."""
+    global _DESCRIBER
+
+    with _DESCRIBER_LOCK:
+        if _DESCRIBER is None:
+            model_cls = PictureDescriptionVlmModel if VLM_API_URL is None else PictureDescriptionApiModel
+            describer = model_cls(
+                enabled=True,
+                enable_remote_services=VLM_API_URL is not None,
+                artifacts_path=settings.artifacts_path,
+                options=_build_picture_description_options(),
+                accelerator_options=AcceleratorOptions(
+                    device=ACCELERATOR_DEVICE,
+                    num_threads=os.cpu_count(),
+                ),
+            )
+            if isinstance(describer, PictureDescriptionVlmModel):
+                _quantize_picture_description(describer)
+            _DESCRIBER = describer
+        return _DESCRIBER
+
+def _describe_pictures(doc) -> None:
+    """Annotate *doc*'s pictures with descriptions, in batches."""
+
+    pictures = [(item, item.get_image(doc)) for item in doc.pictures]
+    elements = [
+        ItemAndImageEnrichmentElement(item=item, image=image)
+        for item, image in pictures if image is not None
+    ]
+    if not elements:
+        return
+
+    describer = _picture_describer()
+    batch_size = settings.perf.elements_batch_size
+    for start in range(0, len(elements), batch_size):
+        for _ in describer(doc, elements[start:start + batch_size]):
+            pass
+
+    # Only the high tier returns picture images; they were kept for this pass
+    if DEVICE_CAPABILITY != "high":
+        for item, _ in pictures:
+            item.image = None
+
+def _batch_easyocr(converter: DocumentConverter) -> None:
+    """Make EasyOCR recognize EASYOCR_BATCH_SIZE text boxes per forward pass."""
+
+    for stage in _pipeline_stages(converter):
+        reader = getattr(stage, "reader", None)
+        if isinstance(stage, EasyOcrModel) and reader is not None:
+            reader.readtext = functools.partial(reader.readtext, batch_size=EASYOCR_BATCH_SIZE)
+
+# Pipelines (and so the models they hold) shared by every converter; Docling
+# keys them by pipeline class and options, so converters that differ only in
+# their PDF backend run on the same loaded models. The ledger drops entries
+# once no converter it holds uses them.
+_PIPELINES = {}
+
+# Attribute paths of the nn.Modules worth compiling on each stage. Only
+# modules that are called (forward) count: TableFormer runs through its
+# model's predict(), whose one direct module call is the image encoder.
+_COMPILE_TARGETS = {
+    LayoutModel: ("layout_predictor._model",),
+    TableStructureModel: ("tf_predictor._model._encoder",),
+    EasyOcrModel: ("reader.detector", "reader.recognizer"),
+}
+
+def _compile_models(converter: DocumentConverter) -> list:
+    """Wrap the layout, TableFormer and EasyOCR networks in torch.compile
+    (CUDA only), returning ``(owner, attr, module)`` for each eager module
+    replaced.
+
+    Compilation happens lazily on the first forward pass (the warmup), and
+    with TORCHINDUCTOR_CACHE_DIR on a persistent volume the compiled kernels
+    are reused across restarts.
+    """
+
+    eager = []
+    if not TORCH_COMPILE or not torch.cuda.is_available():
+        return eager
+
+    mode = "max-autotune-no-cudagraphs"
+    for stage in _pipeline_stages(converter):
+        for target in _COMPILE_TARGETS.get(type(stage), ()):
+            *path, attr = target.split(".")
+            owner = functools.reduce(lambda obj, name: getattr(obj, name, None), path, stage)
+            model = getattr(owner, attr, None)
+            # EasyOCR wraps its networks in DataParallel on CUDA; that only
+            # calls straight into the wrapped module when there is one device
+            if isinstance(model, torch.nn.DataParallel):
+                if len(model.device_ids) > 1:
+                    continue
+                owner, attr, model = model, "module", model.module
+            if isinstance(model, torch.nn.Module):
+                # dynamic shapes so differing page sizes don't trigger recompiles
+                setattr(owner, attr, torch.compile(model, mode=mode, dynamic=True, fullgraph=False))
+                eager.append((owner, attr, model))
+                log.info("Compiled %s.%s with torch.compile (%s).", type(stage).__name__, target, mode)
+    return eager
+
+def create_converter(enrichments: frozenset = DEFAULT_ENRICHMENTS,
+                     high_quality_tables: bool = False,
+                     force_ocr: bool = False,
+                     compile_models: bool = False) -> DocumentConverter:
+    """Create a DocumentConverter configured from environment variables.
+
+    Only the given *enrichments* are run. PDFs are parsed with pypdfium,
+    which is roughly twice as fast and far lighter on memory than Docling's
+    native parser; *high_quality_tables* switches to the native parser for
+    its better table cell recovery. *force_ocr* OCRs every page in full.
+    *compile_models* runs torch.compile over a newly built pipeline, which
+    takes minutes, so only startup asks for it.
+    """
+
+    pipeline_options = _build_pipeline_options(DEVICE_CAPABILITY, enrichments, force_ocr)
+    pdf_backend = DoclingParseV4DocumentBackend if high_quality_tables else PyPdfiumDocumentBackend
 
     format_options = {
         # PDF with custom pipeline options
-        InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options),
+        InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options, backend=pdf_backend),
         InputFormat.IMAGE: ImageFormatOption(pipeline_options=pipeline_options),
     }
 
-    return DocumentConverter(format_options=format_options)
+    converter = DocumentConverter(format_options=format_options)
+    converter.initialized_pipelines = _PIPELINES
+
+    # Build the PDF pipeline (loading its models) up front so it can be tuned,
+    # unless another converter already built and tuned the same one
+    known_pipelines = len(_PIPELINES)
+    converter.initialize_pipeline(InputFormat.PDF)
+    if len(_PIPELINES) > known_pipelines:
+        if compile_models:
+            eager = _compile_models(converter)
+            # Compilation only really happens on the first forward pass, so
+            # run one now and fall back to the eager models if it fails
+            if eager and not _warmup(converter):
+                for owner, attr, model in eager:
+                    setattr(owner, attr, model)
+                log.warning("Compiled models failed to warm up; running them eagerly.")
+        _batch_easyocr(converter)
+
+    # From here on the converter only sees its own pipeline, which it then
+    # keeps alive (e.g. mid-conversion) even after _PIPELINES lets go of it
+    pipeline = converter._get_pipeline(InputFormat.PDF)
+    converter.initialized_pipelines = {
+        key: value for key, value in _PIPELINES.items() if value is pipeline
+    }
+
+    return converter
+
+def _warmup(converter: DocumentConverter) -> bool:
+    """Push one tiny document through every model so cuDNN autotuning, kernel
+    JIT and allocator growth happen now rather than on the first request.
+    Returns whether it succeeded."""
+
+    try:
+        converter.convert(DocumentStream(name="warmup.pdf", stream=BytesIO(_WARMUP_PDF)))
+        # The warmup page has a text layer, so OCR never sees it; run
+        # EasyOCR's detector and recognizer on a blank A4-sized batch instead
+        for stage in _pipeline_stages(converter):
+            reader = getattr(stage, "reader", None)
+            if isinstance(stage, EasyOcrModel) and reader is not None and reader.device == "cuda":
+                pages = np.zeros([EASYOCR_BATCH_SIZE, 1365, 1024, 3], dtype=np.uint8)
+                reader.readtext_batched(pages, n_width=1024, n_height=1365,
+                                        batch_size=EASYOCR_BATCH_SIZE)
+            # Nor does it have a table, so feed TableFormer's encoder a blank
+            # table crop at the size the predictor resizes tables to
+            predictor = getattr(stage, "tf_predictor", None)
+            if isinstance(stage, TableStructureModel) and predictor is not None:
+                size = predictor._config["dataset"]["resized_image"]
+                with torch.inference_mode():
+                    predictor._model._encoder(torch.zeros(1, 3, size, size, device=predictor._device))
+        if torch.cuda.is_available():
+            torch.cuda.synchronize()
+    except Exception as e:
+        log.warning("Warmup failed: %s", e)
+        return False
+    return True
+
+def _pipeline_of(key: tuple) -> tuple:
+    """The part of a ledger key that decides its pipeline; the PDF backend
+    (high_quality_tables) does not."""
+    enrichments, _, force_ocr = key
+    return enrichments, force_ocr
+
+class _ConverterLedger:
+    """Converters kept loaded for reuse across requests, keyed by their
+    configuration. The few most recently used configurations stay loaded,
+    running on at most *max_pipelines* distinct pipelines (full model sets);
+    evicting one unloads its pipeline unless another converter shares it.
+    Pinned converters are never evicted."""
+
+    def __init__(self, size: int = 8, max_pipelines: int = 2):
+        self._size = size
+        self._max_pipelines = max(1, max_pipelines)
+        self._converters = OrderedDict()
+        self._pinned = set()
+        self._lock = threading.Lock()
+
+    def get(self, enrichments: frozenset, high_quality_tables: bool,
+            force_ocr: bool, compile_models: bool = False,
+            pin: bool = False) -> DocumentConverter:
+        """Return the converter for this configuration, building and warming it
+        on first use (see create_converter for *compile_models*). *pin* keeps
+        it loaded for good."""
+
+        key = (enrichments, high_quality_tables, force_ocr)
+        # Held while building so concurrent requests never load the models twice
+        with self._lock:
+            converter = self._converters.get(key)
+            if converter is None:
+                # Make room first, so loading the new models never goes past
+                # the budget even briefly
+                self._evict(key, reserve=True)
+                converter = create_converter(enrichments, high_quality_tables, force_ocr,
+                                             compile_models)
+                if os.getenv("WARMUP", "1") == "1":
+                    _warmup(converter)
+                self._converters[key] = converter
+            if pin:
+                self._pinned.add(key)
+            self._converters.move_to_end(key)
+            self._evict(key)
+            return converter
+
+    def _pipelines_in_use(self) -> set:
+        in_use = set()
+        for converter in self._converters.values():
+            in_use.update(converter.initialized_pipelines)
+        return in_use
+
+    def _resident_pipelines(self) -> set:
+        return {_pipeline_of(key) for key in self._converters}
+
+    def _evict(self, key: tuple, reserve: bool = False) -> None:
+        """Evict the least recently used converters until the budget holds,
+        with room for *key*'s converter and pipeline if *reserve* (lock held).
+
+        Converters on *key*'s pipeline stay, since *key* runs on their
+        models, and so do pinned ones, even if that leaves the budget
+        exceeded.
+        """
+
+        pipeline = _pipeline_of(key)
+        max_converters = self._size - reserve
+        max_pipelines = self._max_pipelines
+        if reserve and pipeline not in self._resident_pipelines():
+            max_pipelines -= 1
+
+        evicted = False
+        for held in list(self._converters):
+            if (len(self._converters) <= max_converters
+                    and len(self._resident_pipelines()) <= max_pipelines):
+                break
+            if held in self._pinned or _pipeline_of(held) == pipeline:
+                continue
+            del self._converters[held]
+            evicted = True
+        if evicted:
+            self._release_pipelines()
 
-converter = create_converter()
+    def _release_pipelines(self) -> None:
+        """Drop the pipelines no held converter uses (lock held)."""
 
-def handler(source: str):
-    """Enhanced handler function with full document processing capabilities."""
+        in_use = self._pipelines_in_use()
+        for key in [key for key in _PIPELINES if key not in in_use]:
+            del _PIPELINES[key]
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+    def clear(self) -> None:
+        """Drop every converter and the pipelines (and models) they share."""
+
+        with self._lock:
+            self._converters.clear()
+            _PIPELINES.clear()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+# Every enrichment combination a client asks for needs its own pipeline, so
+# cap how many stay resident instead of letting requests pile them up
+_LEDGER = _ConverterLedger(max_pipelines=int(os.getenv("MAX_PIPELINES", "2")))
+atexit.register(_LEDGER.clear)
+
+def get_converter(enrichments: frozenset = DEFAULT_ENRICHMENTS,
+                  high_quality_tables: bool = False,
+                  force_ocr: bool = False) -> DocumentConverter:
+    """Return the loaded converter for this configuration."""
+    return _LEDGER.get(enrichments, high_quality_tables, force_ocr)
+
+def clear_model_cache() -> None:
+    """Unload every model to relieve memory pressure; the next request
+    reloads what it needs."""
+    global _DESCRIBER
+    with _DESCRIBER_LOCK:
+        _DESCRIBER = None
+    _LEDGER.clear()
+
+# Load (and compile) the tier's preset pipeline at import so the first request
+# doesn't pay for it; pipelines built later for other enrichment combinations
+# run uncompiled rather than stall a request on compilation. Pinned, so
+# requests for other combinations never evict it and have it rebuilt
+# without compilation.
+_LEDGER.get(DEFAULT_ENRICHMENTS, False, False, compile_models=True, pin=True)
+
+# One pooled client for the whole process so keep-alive connections (and the
+# TLS sessions behind them) are reused across requests instead of being
+# re-established for every download.
+_CLIENT = httpx.AsyncClient(
+    http2=True,
+    timeout=httpx.Timeout(60.0, connect=10.0),
+    limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
+)
+
+async def close_client() -> None:
+    """Close the pooled HTTP client's connections; call on shutdown."""
+    await _CLIENT.aclose()
+
+# Caps how many conversions run at once; each one holds the models' activations
+# on the GPU, so going past what fits in VRAM ends in CUDA OOM.
+GPU_SLOTS = int(os.getenv("GPU_SLOTS", "1"))
+_CONVERT_SLOTS = asyncio.Semaphore(GPU_SLOTS)
+
+# Converted results keyed by content hash. Bump the leading number of
+# PIPELINE_REV whenever a change alters the output, so stale entries are
+# never served.
+PIPELINE_REV = f"6:{DEVICE_CAPABILITY}:{OCR_ENGINE}"
+# Picture descriptions also depend on which model writes them and how it is
+# quantized; only keys of results that ran it include this
+DESCRIBER_REV = blake3(":".join([
+    _build_picture_description_options().model_dump_json(),
+    _vlm_quantization_mode(),
+]).encode()).hexdigest(length=8)
+_CACHE = diskcache.Cache(
+    os.getenv("DOC_CACHE_DIR", str(Path.home() / ".cache" / "doc_processor")),
+    size_limit=int(os.getenv("DOC_CACHE_SIZE_GB", "4")) << 30,
+)
+
+# The most recently used results are also kept in process memory, up to
+# DOC_CACHE_MEMORY_MB of content, so hot documents skip the disk read and
+# unpickling
+_MEMORY_CACHE_BUDGET = int(os.getenv("DOC_CACHE_MEMORY_MB", "256")) << 20
+_MEMORY_CACHE = OrderedDict()
+_MEMORY_CACHE_LOCK = threading.Lock()
+_memory_cache_bytes = 0
+
+def _result_size(result: dict) -> int:
+    """Approximate memory held by *result*: its content plus a flat allowance
+    for the (small) metadata."""
+    return sys.getsizeof(result.get("content") or "") + 4096
+
+def _remember(key: str, result: dict) -> None:
+    """Store *result* in the in-memory LRU, evicting the oldest entries."""
+    global _memory_cache_bytes
+    size = _result_size(result)
+    if size > _MEMORY_CACHE_BUDGET:
+        return
+    with _MEMORY_CACHE_LOCK:
+        previous = _MEMORY_CACHE.pop(key, None)
+        if previous is not None:
+            _memory_cache_bytes -= _result_size(previous)
+        _MEMORY_CACHE[key] = result
+        _memory_cache_bytes += size
+        while _memory_cache_bytes > _MEMORY_CACHE_BUDGET:
+            _, evicted = _MEMORY_CACHE.popitem(last=False)
+            _memory_cache_bytes -= _result_size(evicted)
+
+def _private_copy(result: dict) -> dict:
+    """Copy *result* so callers can modify it; the (immutable, possibly huge)
+    content string is shared rather than copied."""
+    return {**result, "metadata": copy.deepcopy(result["metadata"])}
+
+def _cache_get(key: str):
+    """Return a private copy of the cached result for *key*, or None."""
+    with _MEMORY_CACHE_LOCK:
+        result = _MEMORY_CACHE.get(key)
+        if result is not None:
+            _MEMORY_CACHE.move_to_end(key)
+    if result is None:
+        result = _CACHE.get(key)
+        if result is None:
+            return None
+        _remember(key, result)
+    return _private_copy(result)
+
+def _cache_set(key: str, result: dict) -> None:
+    """Store *result* under *key* in memory and on disk."""
+    _CACHE.set(key, result)
+    _remember(key, _private_copy(result))
+
+_CHUNK_SIZE = 1 << 20  # 1 MiB
+
+# Most disk a download reserves up front on the remote's word (Content-Length)
+_MAX_PREALLOCATE = 128 << 20  # 128 MiB
+
+# Exporter of a DoclingDocument for each supported export_format; there is
+# no export_to_json, so JSON is the serialized document dict
+_EXPORTERS = {
+    "markdown": lambda doc: doc.export_to_markdown(),
+    "html": lambda doc: doc.export_to_html(),
+    "json": lambda doc: orjson.dumps(doc.export_to_dict()).decode(),
+    "text": lambda doc: doc.export_to_text(),
+}
+
+async def _download(source: str, dest: Path, max_file_size=None) -> str:
+    """Stream *source* into *dest* and return the BLAKE3 hash of the content.
+
+    Rejects documents whose Content-Length is over *max_file_size* up front
+    and aborts as soon as more than that many bytes have arrived.
+    """
+    digest = blake3(max_threads=blake3.AUTO)
+    async with _CLIENT.stream("GET", source) as response:
+        response.raise_for_status()
+        size = int(response.headers.get("Content-Length", 0))
+        # Refuse an oversized document before any of its body arrives
+        if max_file_size and size > max_file_size:
+            raise ValueError(f"Document of {size} bytes exceeds max_file_size={max_file_size} bytes")
+        with open(dest, "wb") as f:
+            # Reserve the whole file when the size is known so it is allocated
+            # once instead of being grown chunk by chunk (Linux; macOS lacks
+            # posix_fallocate)
+            if size and hasattr(os, "posix_fallocate"):
+                os.posix_fallocate(f.fileno(), 0, min(size, _MAX_PREALLOCATE))
+            received = 0
+            async for chunk in response.aiter_bytes(_CHUNK_SIZE):
+                received += len(chunk)
+                if max_file_size and received > max_file_size:
+                    raise ValueError(f"Document exceeds max_file_size={max_file_size} bytes")
+                f.write(chunk)
+                digest.update(chunk)
+            # Drop any reserved tail the (decoded) body didn't fill
+            f.truncate()
+    return digest.hexdigest(length=16)
+
+def _hash_file(path: Path) -> str:
+    """Return the BLAKE3 hash of the file at *path*, matching _download's."""
+    digest = blake3(max_threads=blake3.AUTO)
+    digest.update_mmap(path)
+    return digest.hexdigest(length=16)
+
+def _read_stream(stream: BinaryIO, max_file_size=None) -> bytes:
+    """Read binary file object *stream* to the end in chunks, aborting as soon
+    as more than *max_file_size* bytes have been read."""
+
+    chunks = []
+    received = 0
+    while chunk := stream.read(_CHUNK_SIZE):
+        if not isinstance(chunk, (bytes, bytearray)):
+            raise ValueError("File object sources must be opened in binary mode")
+        received += len(chunk)
+        if max_file_size and received > max_file_size:
+            raise ValueError(f"Document exceeds max_file_size={max_file_size} bytes")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+async def _load(source, tmpdir: Path, max_file_size=None):
+    """Resolve *source* to ``(source, filename, document, content_hash)``.
+
+    URLs are downloaded into *tmpdir*; local paths and in-memory documents
+    (bytes or binary file objects) are used where they are, with *document*
+    being a Path or the raw bytes respectively.
+    """
+
+    if isinstance(source, (bytes, bytearray, memoryview)) or hasattr(source, "read"):
+        name = getattr(source, "name", None)
+        if hasattr(source, "read"):
+            document = await asyncio.to_thread(_read_stream, source, max_file_size)
+        else:
+            document = bytes(source)
+        filename = os.path.basename(name) if isinstance(name, str) else "document"
+        if max_file_size and len(document) > max_file_size:
+            raise ValueError(f"Document exceeds max_file_size={max_file_size} bytes")
+        content_hash = blake3(document, max_threads=blake3.AUTO).hexdigest(length=16)
+        return None, filename, document, content_hash
+
+    if not isinstance(source, (str, Path)):
+        raise ValueError(f"Unsupported source type: {type(source).__name__}")
+
+    if isinstance(source, Path) or not source.startswith(("http://", "https://")):
+        path = Path(source)
+        if max_file_size and path.stat().st_size > max_file_size:
+            raise ValueError(f"Document exceeds max_file_size={max_file_size} bytes")
+        content_hash = await asyncio.to_thread(_hash_file, path)
+        return str(path), path.name, path, content_hash
+
+    # Last (decoded) path segment, ignoring any query string or fragment;
+    # decoding first so an encoded "/" can't climb out of tmpdir
+    filename = posixpath.basename(unquote(urlsplit(source).path))
+    if filename in ("", ".", ".."):
+        filename = "document"
+    path = tmpdir / filename
+    content_hash = await _download(source, path, max_file_size)
+    return source, filename, path, content_hash
+
+def _convert(source, filename: str, document, export_format: str, max_pages, max_file_size,
+             enrichments: frozenset, high_quality_tables: bool, force_ocr: bool):
+    """Run the (blocking) Docling conversion of *document* (a path or bytes)
+    and build the result payload."""
+
+    # Convert with limits
+    convert_kwargs = {}
+    if max_pages:
+        # Convert only the first max_pages pages; max_num_pages would reject
+        # longer documents outright
+        convert_kwargs['page_range'] = (1, max_pages)
+    if max_file_size:
+        convert_kwargs['max_file_size'] = max_file_size
+    
+    if isinstance(document, bytes):
+        document = DocumentStream(name=filename, stream=BytesIO(document))
+
+    log.info("Converting %s with %s capability pipeline...", filename, DEVICE_CAPABILITY)
+    # Have Docling report failures in the result rather than re-raise whatever
+    # a stage threw (pdfium errors, CUDA OOM), so they all end up as
+    # ConversionError
+    result = get_converter(enrichments, high_quality_tables, force_ocr).convert(
+        document, raises_on_error=False, **convert_kwargs,
+    )
+    errors = "; ".join(error.error_message for error in result.errors)
+    if result.status == ConversionStatus.PARTIAL_SUCCESS:
+        log.warning("Converted %s only in part: %s", filename, errors)
+    elif result.status != ConversionStatus.SUCCESS:
+        raise ConversionError(f"Conversion of {filename} failed ({result.status.value}): {errors or 'no details'}")
+    doc = result.document
+
+    if "picture_description" in enrichments:
+        _describe_pictures(doc)
+    
+    # Export in requested format
+    output_content = _EXPORTERS[export_format](doc)
+    
+    pages = getattr(doc, 'pages', None)
+
+    # Collect processing metadata
+    metadata = {
+        "source": source,
+        "filename": filename,
+        "page_count": len(pages) if pages is not None else None,
+        "export_format": export_format,
+        "device_capability": DEVICE_CAPABILITY,
+        "pdf_backend": "docling_parse" if high_quality_tables else "pypdfium",
+        "enrichments_applied": {name: name in enrichments for name in ENRICHMENTS},
+    }
     
-    # Configuration options from input
-    export_format = 'markdown'  # markdown, html, json, text
-    max_pages = None
-    max_file_size = 100 * 1024 * 1024  # 100MB default
+    # Count enriched elements
+    labels = Counter(getattr(item, 'label', None) for item in doc.texts)
+    metadata["enrichment_stats"] = {
+        "code_blocks": labels[DocItemLabel.CODE],
+        "formulas": labels[DocItemLabel.FORMULA],
+        "images": len(getattr(doc, 'pictures', ())),
+        "tables": len(getattr(doc, 'tables', ())),
+    }
+    
+    return {
+        "content": output_content,
+        "metadata": metadata,
+        "status": "success"
+    }
 
-    result = None
+def get_result(document_id: str):
+    """Return the cached result of an earlier conversion, or None if unknown
+    or already evicted."""
+    return _cache_get(document_id)
+
+async def handler(source: str | Path | bytes | BinaryIO, export_format: str = 'markdown', max_pages=None,
+                  max_file_size=100 * 1024 * 1024, enrichments=None,
+                  high_quality_tables: bool = False, force_ocr: bool = False):
+    """Enhanced handler function with full document processing capabilities.
+
+    *source* is an http(s) URL, a local path, or the document itself as
+    bytes or a binary file object; only URLs are downloaded.
+    *export_format* is one of markdown, html, json or text (markdown for
+    anything else). Only the first *max_pages* pages are converted, and
+    documents over *max_file_size* bytes (100MB default) are rejected.
+    *enrichments* picks which of ENRICHMENTS to run (the tier's defaults
+    when omitted). Set
+    *high_quality_tables* to parse PDFs with Docling's native backend,
+    trading speed and memory for better table fidelity. OCR only reads
+    bitmap regions, leaving text the PDF already carries as-is, unless
+    *force_ocr*, which OCRs every page in full.
+
+    A document that cannot be fetched or converted yields
+    ``{"status": "error", ...}`` rather than raising, so one bad input
+    doesn't abort a batch; anything else (a bug) propagates.
+    """
+
+    source_label = str(source) if isinstance(source, (str, Path)) else None
     try:
-        # Download document
-        with httpx.Client(timeout=60.0) as client:
-            response = client.get(source)
-            response.raise_for_status()
-            
-            # Create document stream
-            stream = BytesIO(response.content)
-            filename = source.split("/")[-1] if "/" in source else "document"
-            doc_stream = DocumentStream(name=filename, stream=stream)
-            
-            # Convert with limits
-            convert_kwargs = {}
-            if max_pages:
-                convert_kwargs['max_num_pages'] = max_pages
-            if max_file_size:
-                convert_kwargs['max_file_size'] = max_file_size
-            
-            print(f"Converting {filename} with {DEVICE_CAPABILITY} capability pipeline...")
-            result = converter.convert(doc_stream, **convert_kwargs)
-            doc = result.document
-            
-            # Export in requested format
-            if export_format.lower() == 'markdown':
-                output_content = doc.export_to_markdown()
-            elif export_format.lower() == 'html':
-                output_content = doc.export_to_html()
-            elif export_format.lower() == 'json':
-                output_content = doc.export_to_json()
-            elif export_format.lower() == 'text':
-                output_content = doc.export_to_text()
+        export_format = export_format.lower()
+        if export_format not in _EXPORTERS:
+            export_format = 'markdown'  # fallback
+
+        if enrichments is None:
+            enrichments = DEFAULT_ENRICHMENTS
+        else:
+            enrichments = frozenset(enrichments)
+            unknown = enrichments.difference(ENRICHMENTS)
+            if unknown:
+                raise ValueError(f"Unknown enrichments: {', '.join(sorted(unknown))}")
+
+        # URLs are downloaded straight to disk for Docling to open itself
+        with tempfile.TemporaryDirectory(prefix="doc_processor_") as tmpdir:
+            source, filename, document, content_hash = await _load(
+                source, Path(tmpdir), max_file_size,
+            )
+
+            pdf_backend = "docling_parse" if high_quality_tables else "pypdfium"
+            # The cache key doubles as the document id clients fetch content by
+            cache_key = blake3(":".join([
+                content_hash, export_format, str(max_pages or ""), pdf_backend, ",".join(sorted(enrichments)),
+                "force_ocr" if force_ocr else "", PIPELINE_REV,
+                DESCRIBER_REV if "picture_description" in enrichments else "",
+            ]).encode()).hexdigest(length=16)
+            result = await asyncio.to_thread(_cache_get, cache_key)
+            if result is not None:
+                # Identical bytes may have come from a different URL
+                result["metadata"].update(source=source, filename=filename)
             else:
-                output_content = doc.export_to_markdown()  # fallback
-            
-            # Collect processing metadata
-            # Flag which enrichments were *actually* enabled based on DEVICE_CAPABILITY
-            enrichment_flags = {
-                "low": {
-                    "code_enrichment": False,
-                    "formula_enrichment": False,
-                    "picture_classification": False,
-                    "picture_description": False,
-                    "table_structure": False,
-                    "ocr": False,
-                },
-                "medium": {
-                    "code_enrichment": True,
-                    "formula_enrichment": True,
-                    "picture_classification": False,
-                    "picture_description": False,
-                    "table_structure": True,
-                    "ocr": True,
-                },
-                "high": {
-                    "code_enrichment": True,
-                    "formula_enrichment": True,
-                    "picture_classification": True,
-                    "picture_description": True,
-                    "table_structure": True,
-                    "ocr": True,
-                },
-            }
-
-            metadata = {
-                "source": source,
-                "filename": filename,
-                "page_count": len(doc.pages) if hasattr(doc, 'pages') else None,
-                "export_format": export_format,
-                "device_capability": DEVICE_CAPABILITY,
-                "enrichments_applied": enrichment_flags[DEVICE_CAPABILITY],
-            }
-            
-            # Count enriched elements
-            enrichment_stats = {
-                "code_blocks": 0,
-                "formulas": 0,
-                "images": 0,
-                "tables": 0
-            }
-            
-            # Count different element types
-            for item in doc.texts:
-                if hasattr(item, 'label'):
-                    if item.label == 'FORMULA':
-                        enrichment_stats["formulas"] += 1
-            
-            if hasattr(doc, 'pictures'):
-                enrichment_stats["images"] = len(doc.pictures)
+                # Conversion is CPU/GPU bound, keep it off the event loop
+                async with _CONVERT_SLOTS:
+                    result = await asyncio.to_thread(
+                        _convert, source, filename, document, export_format, max_pages, max_file_size,
+                        enrichments, high_quality_tables, force_ocr,
+                    )
+                result["metadata"]["content_hash"] = content_hash
+                result["metadata"]["document_id"] = cache_key
+                await asyncio.to_thread(_cache_set, cache_key, result)
             
-            if hasattr(doc, 'tables'):
-                enrichment_stats["tables"] = len(doc.tables)
-                
-            if hasattr(doc, 'code'):
-                enrichment_stats["code_blocks"] = len(doc.code)
-            
-            metadata["enrichment_stats"] = enrichment_stats
-            
-            result = {
-                "content": output_content,
-                "metadata": metadata,
-                "status": "success"
-            }
-            
-    except httpx.RequestError as e:
-        raise Exception(f"HTTP request failed: {str(e)}")
-        
+    except (httpx.HTTPError, ConversionError, OSError, ValueError) as e:
+        log.warning("Processing %s failed: %r", source_label or "document", e)
+        return {
+            "status": "error",
+            "source": source_label,
+            "error": str(e),
+            "error_type": type(e).__name__,
+        }
+
+    return result
+
+async def handler_batch(sources, **options):
+    """Process several sources at once, returning results in input order.
+
+    Up to twice GPU_SLOTS documents are in flight at a time, so fetching the
+    next ones overlaps converting earlier ones without a large batch
+    exhausting the connection pool or filling the disk with downloads.
+    *options* are passed to handler() for every source. Documents that fail
+    yield handler()'s error result, and an unexpected exception is returned
+    in place of its result instead of failing the batch.
+    """
+    in_flight = asyncio.Semaphore(2 * GPU_SLOTS)
+
+    async def process(source):
+        async with in_flight:
+            return await handler(source, **options)
+
+    return await asyncio.gather(
+        *(process(source) for source in sources),
+        return_exceptions=True,
+    )
+
+# Event loop of a handler_many worker process, reused for all its documents
+_WORKER_LOOP = None
+
+def _worker_init() -> None:
+    """Set up a handler_many worker. Importing this module in the fresh
+    process has already loaded (and warmed) its converter."""
+    global _WORKER_LOOP
+    _WORKER_LOOP = asyncio.new_event_loop()
+    asyncio.set_event_loop(_WORKER_LOOP)
+
+def _worker_run(source, options: dict):
+    """Process one source in a worker, returning any unexpected exception."""
+    try:
+        return _WORKER_LOOP.run_until_complete(handler(source, **options))
     except Exception as e:
-        raise Exception(f"Processing failed: {str(e)}")
-    
-    return result
\ No newline at end of file
+        return e
+
+# GPU memory budgeted for each model set (pipeline) a worker loads
+_PIPELINE_GPU_BYTES = 6 << 30
+
+def _default_workers(options: dict) -> int:
+    """Worker processes handler_many can run without exhausting the host.
+
+    Each worker loads the preset pipeline at import, plus a second one when
+    *options* ask for other enrichments, budgeted at 6GB of GPU memory
+    apiece out of what is free now (so after this process's own models).
+    On CPU-only hosts a single conversion already uses every core.
+    """
+    if not torch.cuda.is_available():
+        return 1
+    enrichments = options.get("enrichments")
+    preset = enrichments is None or frozenset(enrichments) == DEFAULT_ENRICHMENTS
+    pipelines = 1 if preset and not options.get("force_ocr") else 2
+    free_bytes, _ = torch.cuda.mem_get_info()
+    return max(1, min(os.cpu_count(), free_bytes // (pipelines * _PIPELINE_GPU_BYTES)))
+
+def handler_many(sources, workers: int | None = None, **options):
+    """Process many sources across *workers* processes, yielding results in
+    input order.
+
+    Each worker holds its own converter, so documents convert fully in
+    parallel rather than sharing one pipeline; use it for bulk ingestion,
+    and handler_batch() inside a server. *sources* must be picklable (URLs,
+    paths or bytes) and *options* are passed to handler() for every source.
+    Failures come back as for handler_batch(). Closing the generator early
+    cancels the sources not yet started.
+    """
+    workers = workers or _default_workers(options)
+    # CUDA cannot be re-initialized in a forked child
+    context = multiprocessing.get_context("spawn")
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                   initializer=_worker_init)
+    try:
+        yield from executor.map(functools.partial(_worker_run, options=options),
+                                sources, chunksize=1)
+    finally:
+        executor.shutdown(cancel_futures=True)
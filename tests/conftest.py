@@ -0,0 +1,152 @@
+"""Make processor importable without docling, torch or any model weights.
+
+The heavy dependencies are replaced by permissive stand-ins before processor
+is imported, and the import-time converter build runs against a fake
+DocumentConverter, so the tests exercise processor's own logic only.
+"""
+
+import os
+import sys
+import tempfile
+import types
+from pathlib import Path
+
+os.environ.setdefault("DEVICE_CAPABILITY", "medium")
+os.environ.setdefault("WARMUP", "0")
+os.environ.setdefault("TORCH_COMPILE", "0")
+os.environ.setdefault("DOC_CACHE_DIR", tempfile.mkdtemp(prefix="doc_processor_test_cache_"))
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+class _StubMeta(type):
+    """Class attributes (enum members and the like) are stubs too."""
+
+    def __getattr__(cls, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        value = _Stub()
+        setattr(cls, name, value)
+        return value
+
+
+class _Stub(metaclass=_StubMeta):
+    """Accepts any arguments and grows any attribute it is asked for."""
+
+    def __init__(self, *args, **kwargs):
+        self.__dict__.update(kwargs)
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        value = _Stub()
+        setattr(self, name, value)
+        return value
+
+    def __call__(self, *args, **kwargs):
+        return _Stub()
+
+
+class _StubModule(types.ModuleType):
+    """Module whose every name is a distinct stub class."""
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        cls = _StubMeta(name, (_Stub,), {})
+        setattr(self, name, cls)
+        return cls
+
+
+class FakePipeline:
+    build_pipe = ()
+    enrichment_pipe = ()
+
+
+class FakeDocumentConverter:
+    """Just enough of DocumentConverter for create_converter()."""
+
+    def __init__(self, format_options=None):
+        self.format_options = format_options
+        self.initialized_pipelines = {}
+
+    def _get_pipeline(self, doc_format):
+        options = self.format_options[doc_format].pipeline_options
+        key = ("pipeline",) + tuple(sorted(
+            (name, value) for name, value in vars(options).items() if isinstance(value, bool)
+        ))
+        if key not in self.initialized_pipelines:
+            self.initialized_pipelines[key] = FakePipeline()
+        return self.initialized_pipelines[key]
+
+    def initialize_pipeline(self, doc_format):
+        self._get_pipeline(doc_format)
+
+
+class ConversionError(Exception):
+    pass
+
+
+def _install_stubs() -> None:
+    for name in (
+        "docling",
+        "docling.document_converter",
+        "docling.backend",
+        "docling.backend.json",
+        "docling.backend.json.docling_json_backend",
+        "docling.backend.pypdfium2_backend",
+        "docling.backend.docling_parse_v4_backend",
+        "docling.pipeline",
+        "docling.pipeline.simple_pipeline",
+        "docling.pipeline.vlm_pipeline",
+        "docling.datamodel",
+        "docling.datamodel.base_models",
+        "docling.datamodel.settings",
+        "docling.datamodel.accelerator_options",
+        "docling.datamodel.pipeline_options",
+        "docling.exceptions",
+        "docling.models",
+        "docling.models.base_model",
+        "docling.models.picture_description_api_model",
+        "docling.models.picture_description_vlm_model",
+        "docling.models.layout_model",
+        "docling.models.table_structure_model",
+        "docling.models.easyocr_model",
+        "docling_core",
+        "docling_core.types",
+        "docling_core.types.doc",
+        "docling_core.types.io",
+        "torchao",
+        "torchao.quantization",
+        "onnxruntime",
+    ):
+        sys.modules[name] = _StubModule(name)
+
+    sys.modules["docling.document_converter"].DocumentConverter = FakeDocumentConverter
+    sys.modules["docling.exceptions"].ConversionError = ConversionError
+    sys.modules["docling.datamodel.settings"].settings = types.SimpleNamespace(
+        perf=types.SimpleNamespace(page_batch_size=4, elements_batch_size=16),
+        artifacts_path=None,
+    )
+    sys.modules["onnxruntime"].get_available_providers = lambda: ["CPUExecutionProvider"]
+    sys.modules["docling.datamodel.pipeline_options"].smolvlm_picture_description = types.SimpleNamespace(
+        prompt="Describe this image.",
+        model_dump_json=lambda: '{"repo_id": "smolvlm"}',
+    )
+
+    torch = types.ModuleType("torch")
+    torch.cuda = types.SimpleNamespace(is_available=lambda: False)
+    torch.backends = types.SimpleNamespace(
+        mps=types.SimpleNamespace(is_available=lambda: False),
+        cudnn=types.SimpleNamespace(benchmark=False),
+    )
+    torch.nn = types.SimpleNamespace(
+        Module=type("Module", (), {}),
+        DataParallel=type("DataParallel", (), {}),
+    )
+    torch.float16 = "float16"
+    torch.compile = lambda model, **kwargs: model
+    sys.modules["torch"] = torch
+
+
+_install_stubs()
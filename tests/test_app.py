@@ -0,0 +1,96 @@
+import copy
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app
+
+AUTH = {"Authorization": "Bearer admin"}
+REQUEST = {"document_url": "https://example.com/doc.pdf"}
+RESULT = {
+    "content": "# Title",
+    "metadata": {"document_id": "abc123", "export_format": "markdown"},
+    "status": "success",
+}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """Client for the app, with /process returning ``client.result`` (RESULT
+    unless a test swaps it)."""
+
+    async def fake_handler(source, **options):
+        return copy.deepcopy(client.result)
+
+    client = TestClient(app.app)
+    client.result = RESULT
+    monkeypatch.delenv("API_KEY", raising=False)
+    monkeypatch.setattr(app, "process_handler", fake_handler)
+    return client
+
+
+# Caching
+
+def test_process_returns_etag_of_the_document(client):
+    response = client.post("/process", json=REQUEST, headers=AUTH)
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] == 'W/"abc123"'
+    assert response.json() == {"result": RESULT}
+
+
+def test_process_answers_matching_etag_with_304(client):
+    response = client.post("/process", json=REQUEST,
+                           headers={**AUTH, "If-None-Match": 'W/"abc123"'})
+
+    assert response.status_code == 304
+    assert response.headers["ETag"] == 'W/"abc123"'
+    assert response.content == b""
+
+
+def test_process_ignores_stale_etag(client):
+    response = client.post("/process", json=REQUEST,
+                           headers={**AUTH, "If-None-Match": 'W/"older"'})
+
+    assert response.status_code == 200
+    assert response.json() == {"result": RESULT}
+
+
+
+# Streamed content
+
+def test_process_can_leave_out_the_content(client):
+    response = client.post("/process", json={**REQUEST, "include_content": False}, headers=AUTH)
+
+    result = response.json()["result"]
+    assert "content" not in result
+    assert result["content_url"] == "/process/abc123/content"
+
+
+def test_content_route_streams_cached_content(client, monkeypatch):
+    content = "x" * (200 * 1024)
+    monkeypatch.setattr(app, "get_result", lambda document_id: {**RESULT, "content": content})
+    response = client.get("/process/abc123/content", headers=AUTH)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/markdown")
+    assert response.headers["ETag"] == 'W/"abc123"'
+    assert response.text == content
+
+
+def test_content_route_404s_unknown_documents(client, monkeypatch):
+    monkeypatch.setattr(app, "get_result", lambda document_id: None)
+    response = client.get("/process/unknown/content", headers=AUTH)
+
+    assert response.status_code == 404
+
+
+# Errors
+
+def test_process_reports_failed_documents_as_422(client):
+    client.result = {"status": "error", "source": REQUEST["document_url"],
+                     "error": "broken PDF", "error_type": "ConversionError"}
+    response = client.post("/process", json=REQUEST, headers=AUTH)
+
+    assert response.status_code == 422
+    assert "broken PDF" in response.json()["detail"]
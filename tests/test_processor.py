@@ -0,0 +1,414 @@
+import asyncio
+import io
+import types
+
+import httpx
+import orjson
+import pytest
+from blake3 import blake3
+
+import processor
+
+
+class Picture:
+    def __init__(self, image):
+        self._image = image
+        self.image = image
+
+    def get_image(self, doc):
+        return self._image
+
+
+class Describer:
+    """Records the pictures of every batch it is handed."""
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, doc, batch):
+        items = [element.item for element in batch]
+        self.batches.append(items)
+        yield from items
+
+
+def _pictures(count, missing=()):
+    return [Picture(None if i in missing else f"image-{i}") for i in range(count)]
+
+
+# Second picture description pass
+
+def test_describe_pictures_batches_pictures_with_images(monkeypatch):
+    describer = Describer()
+    monkeypatch.setattr(processor, "_picture_describer", lambda: describer)
+    monkeypatch.setattr(processor.settings.perf, "elements_batch_size", 2)
+    pictures = _pictures(6, missing={3})
+    doc = type("Doc", (), {"pictures": pictures})()
+
+    processor._describe_pictures(doc)
+
+    assert [len(batch) for batch in describer.batches] == [2, 2, 1]
+    described = [item for batch in describer.batches for item in batch]
+    assert described == [p for i, p in enumerate(pictures) if i != 3]
+
+
+def test_describe_pictures_drops_images_below_high_tier(monkeypatch):
+    monkeypatch.setattr(processor, "_picture_describer", Describer)
+    monkeypatch.setattr(processor, "DEVICE_CAPABILITY", "medium")
+    pictures = _pictures(3)
+
+    processor._describe_pictures(type("Doc", (), {"pictures": pictures})())
+
+    assert all(p.image is None for p in pictures)
+
+
+def test_describe_pictures_keeps_images_on_high_tier(monkeypatch):
+    monkeypatch.setattr(processor, "_picture_describer", Describer)
+    monkeypatch.setattr(processor, "DEVICE_CAPABILITY", "high")
+    pictures = _pictures(3)
+
+    processor._describe_pictures(type("Doc", (), {"pictures": pictures})())
+
+    assert [p.image for p in pictures] == ["image-0", "image-1", "image-2"]
+
+
+def test_describe_pictures_never_loads_describer_without_pictures(monkeypatch):
+    def fail():
+        raise AssertionError("describer loaded for a document without pictures")
+
+    monkeypatch.setattr(processor, "_picture_describer", fail)
+    processor._describe_pictures(type("Doc", (), {"pictures": _pictures(2, missing={0, 1})})())
+    processor._describe_pictures(type("Doc", (), {"pictures": []})())
+
+
+
+@pytest.mark.parametrize("capability", ["low", "medium", "high"])
+def test_pictures_to_describe_are_rendered_at_twice_the_scale(capability):
+    options = processor._build_pipeline_options(capability, frozenset({"picture_description"}))
+
+    assert options.generate_picture_images is True
+    assert options.images_scale == 2
+
+# Downloads
+
+def _download(monkeypatch, tmp_path, respond, max_file_size):
+    async def run():
+        client = httpx.AsyncClient(transport=httpx.MockTransport(respond))
+        monkeypatch.setattr(processor, "_CLIENT", client)
+        try:
+            return await processor._download("https://example.com/doc.pdf",
+                                             tmp_path / "doc.pdf", max_file_size)
+        finally:
+            await client.aclose()
+
+    return asyncio.run(run())
+
+
+def test_download_hashes_and_writes_body(monkeypatch, tmp_path):
+    body = b"%PDF-1.4 hello"
+    content_hash = _download(monkeypatch, tmp_path, lambda request: httpx.Response(200, content=body), 1024)
+
+    assert content_hash == blake3(body).hexdigest(length=16)
+    assert (tmp_path / "doc.pdf").read_bytes() == body
+
+
+def test_download_rejects_oversized_content_length_before_writing(monkeypatch, tmp_path):
+    respond = lambda request: httpx.Response(200, content=b"x" * 100)
+
+    with pytest.raises(ValueError, match="max_file_size"):
+        _download(monkeypatch, tmp_path, respond, 10)
+    assert not (tmp_path / "doc.pdf").exists()
+
+
+def test_download_aborts_oversized_stream_without_content_length(monkeypatch, tmp_path):
+    async def chunks():
+        for _ in range(4):
+            yield b"x" * 8
+
+    respond = lambda request: httpx.Response(200, content=chunks())
+
+    with pytest.raises(ValueError, match="max_file_size"):
+        _download(monkeypatch, tmp_path, respond, 10)
+
+
+# Source loading
+
+@pytest.mark.parametrize("url, filename", [
+    ("https://example.com/files/my%20report.pdf?sig=abc#page=2", "my report.pdf"),
+    ("https://example.com/files/..%2F..%2Fetc%2Fpasswd", "passwd"),
+    ("https://example.com/files/%2E%2E", "document"),
+    ("https://example.com/", "document"),
+])
+def test_load_sanitises_url_filenames(monkeypatch, tmp_path, url, filename):
+    destinations = []
+
+    async def fake_download(source, dest, max_file_size=None):
+        destinations.append(dest)
+        return "hash"
+
+    monkeypatch.setattr(processor, "_download", fake_download)
+    source, name, document, _ = asyncio.run(processor._load(url, tmp_path))
+
+    assert (source, name) == (url, filename)
+    assert document == destinations[0] == tmp_path / filename
+
+
+def test_load_reads_binary_file_objects_with_their_name(tmp_path):
+    stream = io.BytesIO(b"%PDF-1.4 hello")
+    stream.name = "/some/dir/report.pdf"
+
+    source, name, document, content_hash = asyncio.run(processor._load(stream, tmp_path))
+
+    assert (source, name, document) == (None, "report.pdf", b"%PDF-1.4 hello")
+    assert content_hash == blake3(b"%PDF-1.4 hello").hexdigest(length=16)
+
+
+def test_load_enforces_max_file_size_on_file_objects(tmp_path):
+    with pytest.raises(ValueError, match="max_file_size"):
+        asyncio.run(processor._load(io.BytesIO(b"x" * 100), tmp_path, max_file_size=10))
+
+
+def test_load_rejects_text_mode_file_objects(tmp_path):
+    with pytest.raises(ValueError, match="binary mode"):
+        asyncio.run(processor._load(io.StringIO("text"), tmp_path))
+
+
+# Model compilation
+
+def test_create_converter_restores_eager_models_when_warmup_fails(monkeypatch):
+    stage = type("Stage", (), {"model": "eager"})()
+
+    def fake_compile(converter):
+        stage.model = "compiled"
+        return [(stage, "model", "eager")]
+
+    monkeypatch.setattr(processor, "_PIPELINES", {})
+    monkeypatch.setattr(processor, "_compile_models", fake_compile)
+    monkeypatch.setattr(processor, "_warmup", lambda converter: False)
+    processor.create_converter(frozenset({"ocr"}), compile_models=True)
+
+    assert stage.model == "eager"
+
+
+# Converter ledger
+
+class FakeConverter:
+    def __init__(self, pipeline_key):
+        self.initialized_pipelines = {pipeline_key: processor._PIPELINES[pipeline_key]}
+
+
+@pytest.fixture
+def pipelines(monkeypatch):
+    """Fresh shared pipelines, built by a fake create_converter in which the
+    PDF backend (high_quality_tables) doesn't affect the pipeline."""
+
+    pipelines = {}
+    monkeypatch.setattr(processor, "_PIPELINES", pipelines)
+
+    def fake_create_converter(enrichments, high_quality_tables, force_ocr, compile_models=False):
+        key = (enrichments, force_ocr)
+        pipelines.setdefault(key, object())
+        return FakeConverter(key)
+
+    monkeypatch.setattr(processor, "create_converter", fake_create_converter)
+    return pipelines
+
+
+A, B, C = frozenset({"ocr"}), frozenset({"table_structure"}), frozenset({"code_enrichment"})
+
+
+def test_ledger_reuses_converters(pipelines):
+    ledger = processor._ConverterLedger()
+
+    assert ledger.get(A, False, False) is ledger.get(A, False, False)
+    assert len(pipelines) == 1
+
+
+def test_ledger_eviction_unloads_pipelines(pipelines):
+    ledger = processor._ConverterLedger(size=8, max_pipelines=2)
+    ledger.get(A, False, False)
+    ledger.get(B, False, False)
+    ledger.get(C, False, False)
+
+    assert set(pipelines) == {(B, False), (C, False)}
+
+
+def test_ledger_backend_switch_reuses_resident_pipeline(pipelines):
+    ledger = processor._ConverterLedger(size=8, max_pipelines=2)
+    ledger.get(A, False, False)
+    ledger.get(B, False, False)
+    ledger.get(A, False, False)
+    b_pipeline = pipelines[(B, False)]
+    ledger.get(B, True, False)  # B's models are loaded, nothing to make room for
+
+    assert set(pipelines) == {(A, False), (B, False)}
+    assert pipelines[(B, False)] is b_pipeline
+
+
+def test_ledger_backend_switch_within_single_pipeline_budget(pipelines):
+    ledger = processor._ConverterLedger(size=8, max_pipelines=1)
+    ledger.get(A, False, False)
+    a_pipeline = pipelines[(A, False)]
+    ledger.get(A, True, False)
+    ledger.get(A, False, False)
+
+    assert pipelines == {(A, False): a_pipeline}
+
+
+def test_ledger_never_evicts_pinned_converters(pipelines):
+    ledger = processor._ConverterLedger(size=8, max_pipelines=1)
+    preset = ledger.get(A, False, False, pin=True)
+    ledger.get(B, False, False)
+    ledger.get(C, False, False)
+
+    assert set(pipelines) == {(A, False), (C, False)}
+    assert ledger.get(A, False, False) is preset
+
+
+def test_ledger_eviction_is_least_recently_used(pipelines):
+    ledger = processor._ConverterLedger(size=8, max_pipelines=2)
+    a = ledger.get(A, False, False)
+    ledger.get(B, False, False)
+    assert ledger.get(A, False, False) is a
+    ledger.get(C, False, False)
+
+    assert set(pipelines) == {(A, False), (C, False)}
+
+
+@pytest.mark.parametrize("max_pipelines", [2, 8])
+def test_ledger_keeps_pipelines_shared_with_held_converters(pipelines, max_pipelines):
+    ledger = processor._ConverterLedger(size=2, max_pipelines=max_pipelines)
+    ledger.get(A, False, False)
+    ledger.get(A, True, False)  # same pipeline, other PDF backend
+    ledger.get(B, False, False)  # evicts (A, False) only by converter count
+
+    assert set(pipelines) == {(A, False), (B, False)}
+
+    ledger.get(C, False, False)  # evicts (A, True), the last user of A's pipeline
+
+    assert set(pipelines) == {(B, False), (C, False)}
+
+
+# Export formats
+
+class ExportDoc:
+    """Only the export API of DoclingDocument."""
+
+    def export_to_markdown(self):
+        return "# Title"
+
+    def export_to_html(self):
+        return "<h1>Title</h1>"
+
+    def export_to_text(self):
+        return "Title"
+
+    def export_to_dict(self):
+        return {"name": "doc", "texts": [{"text": "Title"}]}
+
+
+@pytest.mark.parametrize("export_format", sorted(processor._EXPORTERS))
+def test_exporters_return_text(export_format):
+    content = processor._EXPORTERS[export_format](ExportDoc())
+
+    assert isinstance(content, str) and content
+
+
+def test_json_export_is_the_document_dict():
+    content = processor._EXPORTERS["json"](ExportDoc())
+
+    assert orjson.loads(content) == ExportDoc().export_to_dict()
+
+
+# Batches
+
+def test_handler_batch_bounds_documents_in_flight(monkeypatch):
+    running = []
+    peak = 0
+
+    async def fake_handler(source, **options):
+        nonlocal peak
+        running.append(source)
+        peak = max(peak, len(running))
+        await asyncio.sleep(0)
+        running.remove(source)
+        return source
+
+    monkeypatch.setattr(processor, "handler", fake_handler)
+    monkeypatch.setattr(processor, "GPU_SLOTS", 2)
+    results = asyncio.run(processor.handler_batch(range(10)))
+
+    assert results == list(range(10))
+    assert peak == 4
+
+
+# Conversion errors
+
+def test_handler_returns_error_result_for_failed_conversion(monkeypatch):
+    class FailingConverter:
+        def convert(self, document, raises_on_error=True, **kwargs):
+            assert raises_on_error is False
+            return types.SimpleNamespace(
+                status=processor.ConversionStatus.FAILURE,
+                errors=[types.SimpleNamespace(error_message="CUDA out of memory")],
+            )
+
+    monkeypatch.setattr(processor, "get_converter", lambda *args: FailingConverter())
+    result = asyncio.run(processor.handler(b"%PDF-1.4 failing"))
+
+    assert result["status"] == "error"
+    assert result["error_type"] == "ConversionError"
+    assert "CUDA out of memory" in result["error"]
+
+
+# Result cache
+
+class DiskCache(dict):
+    def set(self, key, value):
+        self[key] = value
+
+
+def _result(content, **metadata):
+    return {"content": content, "metadata": metadata, "status": "success"}
+
+
+@pytest.fixture
+def result_cache(monkeypatch):
+    """Empty memory and disk caches, with a memory budget of three 1KB results."""
+
+    disk = DiskCache()
+    monkeypatch.setattr(processor, "_CACHE", disk)
+    monkeypatch.setattr(processor, "_MEMORY_CACHE", processor.OrderedDict())
+    monkeypatch.setattr(processor, "_memory_cache_bytes", 0)
+    monkeypatch.setattr(processor, "_MEMORY_CACHE_BUDGET", 3 * processor._result_size(_result("")))
+    return disk
+
+
+def test_memory_cache_evicts_least_recently_used_by_size(result_cache):
+    for key in "abc":
+        processor._cache_set(key, _result(""))
+    processor._cache_get("a")
+    processor._cache_set("d", _result(""))
+
+    assert list(processor._MEMORY_CACHE) == ["c", "a", "d"]
+    assert processor._memory_cache_bytes <= processor._MEMORY_CACHE_BUDGET
+
+
+def test_memory_cache_skips_results_over_budget(result_cache):
+    processor._cache_set("big", _result("x" * processor._MEMORY_CACHE_BUDGET))
+
+    assert "big" not in processor._MEMORY_CACHE
+    assert processor._cache_get("big")["content"] == "x" * processor._MEMORY_CACHE_BUDGET
+
+
+def test_cache_get_falls_back_to_disk_and_remembers(result_cache):
+    result_cache.set("k", _result("on disk"))
+
+    assert processor._cache_get("k")["content"] == "on disk"
+    assert "k" in processor._MEMORY_CACHE
+
+
+def test_cache_get_returns_private_metadata(result_cache):
+    processor._cache_set("k", _result("content", source="a.pdf"))
+    processor._cache_get("k")["metadata"]["source"] = "b.pdf"
+
+    assert processor._cache_get("k")["metadata"]["source"] == "a.pdf"